@@ -1,7 +1,11 @@
 from model.data_manager import DataManager
 from model.record import Record
+from model.snapshot import RecordSnapshot, SnapshotError, SnapshotRecords
+from model.validation import RecordValidator
 from view.display import Display
 from view.input import Input
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import pandas as pd
 import os
 
@@ -22,8 +26,12 @@ class MainController:
         An instance of Display to manage the display of data and messages.
     input : Input
         An instance of Input to handle user inputs and interactions.
+    validator : RecordValidator
+        An instance of RecordValidator to check records before they are saved or imported.
     records : list
         A list to store the travel records in memory.
+    SNAPSHOT_PATH : str
+        The local snapshot file used to start without waiting for the database.
 
     Methods
     -------
@@ -41,13 +49,40 @@ class MainController:
         Captures user input to edit an existing travel record.
     delete_record():
         Deletes a travel record based on user input.
+    warm_start():
+        Loads records from the local snapshot and refreshes them from the database in the background.
+    run_batch(commands, jobs=1):
+        Executes commands without prompts, screen clears or pauses.
+    execute_command(command):
+        Executes a single non-interactive command.
     """
 
+    SNAPSHOT_PATH = 'records.snapshot'
+
+    BATCH_COMMANDS = {
+        'load': '_batch_load',
+        'save': '_batch_save',
+        'sort': '_batch_sort',
+        'import': '_batch_import',
+        'export': '_batch_export',
+        'report': '_batch_report',
+        'summary': '_batch_summary',
+        'rebuild-rollups': '_batch_rebuild_rollups',
+        'validate': '_batch_validate',
+        'dedupe': '_batch_dedupe',
+    }
+
+    # Commands replacing self.records or writing many documents and the rollups, which cannot run concurrently
+    SERIAL_COMMANDS = ('load', 'save', 'import', 'rebuild-rollups', 'dedupe')
+
     def __init__(self):
         self.data_manager = DataManager()
         self.display = Display()
         self.input = Input()
+        self.validator = RecordValidator()
         self.records = []
+        self._refresh = None
+        self._records_lock = threading.Lock()
 
     def run(self):
         """
@@ -56,7 +91,7 @@ class MainController:
         The method provides a continuous loop, presenting the user with choices
         and executing the chosen action until the user decides to exit the application.
         """
-        self.load_data_from_db()
+        self.warm_start()
         while True:
             self.display.display_message(
                 "Welcome to the Travel Records Management System!")
@@ -85,8 +120,11 @@ class MainController:
 
             # Wait for user input before clearing the screen
             input("Press Enter to continue...")
-            # Clearing the screen
-            os.system('cls' if os.name == 'nt' else 'clear')
+            # Clearing the screen; ANSI terminals avoid spawning a shell, legacy Windows consoles need cls
+            if os.name == 'nt':
+                os.system('cls')
+            else:
+                print("\033[2J\033[H", end="")
 
     def display_records(self):
         """
@@ -119,17 +157,75 @@ class MainController:
         Loads travel records from MongoDB into memory.
         """
         try:
-            self.records = self.data_manager.read_data_from_db()
+            self._wait_for_refresh()
+            self._replace_records(self.data_manager.read_data_from_db())
             self.display.display_message(
                 "Data loaded successfully from the database.")
         except Exception as e:
             self.display.display_error_message(str(e))
 
+    def warm_start(self):
+        """
+        Loads records from the local snapshot and refreshes them from the database in the background.
+
+        Falls back to a regular database load when there is no usable snapshot.
+
+        Returns
+        -------
+        threading.Thread or None
+            The background refresh thread, or None if no snapshot was used.
+        """
+        try:
+            self.records = RecordSnapshot.open(self.SNAPSHOT_PATH)
+        except SnapshotError:
+            self.load_data_from_db()
+            return None
+        self._refresh = threading.Thread(target=self._refresh_from_db, daemon=True)
+        self._refresh.start()
+        return self._refresh
+
+    def _refresh_from_db(self):
+        try:
+            self._replace_records(self.data_manager.read_data_from_db())
+        except Exception as e:
+            self.display.display_error_message(f"Error refreshing data from the database: {str(e)}")
+
+    def _replace_records(self, records):
+        # Dropping the last reference to a snapshot-backed sequence releases its memory map.
+        # The records are already loaded, so a failed snapshot write is only a warning.
+        with self._records_lock:
+            self.records = records
+            try:
+                RecordSnapshot.write(self.SNAPSHOT_PATH, records)
+            except Exception as e:
+                self.display.display_error_message(f"Warning: the local snapshot was not updated: {str(e)}")
+
+    def _wait_for_refresh(self):
+        # An explicit load or save must not be overtaken by a slower background refresh
+        if self._refresh is not None:
+            self._refresh.join()
+            self._refresh = None
+
+    def _check_not_stale(self):
+        # Waits for the background refresh, then refuses to save records still read from the snapshot
+        self._wait_for_refresh()
+        if isinstance(self.records, SnapshotRecords):
+            raise ValueError("Records come from the local snapshot and may be out of date. "
+                             "Reload them from the database before saving.")
+
     def save_data_to_db(self):
         """
         Saves the travel records from memory into MongoDB.
+
+        Waits for a background refresh to finish first. Nothing is saved if the records
+        still come from the local snapshot or if any record fails validation.
         """
         try:
+            self._check_not_stale()
+            report = self.validator.validate(self.records)
+            if not report.is_valid():
+                self.display.display_error_message(f"Data not saved. {report.summary()}")
+                return
             self.data_manager.save_records_to_db(self.records)
             self.display.display_message("Data saved successfully to the database.")
         except Exception as e:
@@ -178,4 +274,149 @@ class MainController:
         '''
         sort_criteria = self.input.get_sort_criteria()
         sorted_records = self.data_manager.get_sorted_records(sort_criteria)
-        self.display.display_records(sorted_records)
\ No newline at end of file
+        self.display.display_records(sorted_records)
+
+    def run_batch(self, commands, jobs=1):
+        '''
+        Executes commands without prompts, screen clears or pauses.
+
+        Commands are run in order when jobs is 1. With more jobs they are run
+        concurrently on a thread pool, so they must be independent of each other;
+        commands sharing the in-memory records or rewriting the rollups
+        (SERIAL_COMMANDS) are refused.
+
+        Parameters
+        ----------
+        commands : list of list of str
+            Each command is a name from BATCH_COMMANDS followed by its arguments.
+        jobs : int
+            The number of commands to run at the same time.
+
+        Returns
+        -------
+        int
+            The number of commands that failed.
+        '''
+        if jobs > 1:
+            serial = sorted({command[0] for command in commands} & set(self.SERIAL_COMMANDS))
+            if serial:
+                self.display.display_error_message(
+                    f"Cannot run {', '.join(serial)} with more than one job; nothing was run.")
+                return len(commands)
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(self.execute_command, commands))
+        else:
+            results = [self.execute_command(command) for command in commands]
+        return results.count(False)
+
+    def execute_command(self, command):
+        '''
+        Executes a single non-interactive command.
+
+        Parameters
+        ----------
+        command : list of str
+            The command name followed by its arguments.
+
+        Returns
+        -------
+        bool
+            True if the command succeeded, False otherwise.
+        '''
+        name, *args = command
+        handler_name = self.BATCH_COMMANDS.get(name)
+        if handler_name is None:
+            self.display.display_error_message(f"Unknown command: {name}")
+            return False
+        try:
+            getattr(self, handler_name)(*args)
+            return True
+        except Exception as e:
+            self.display.display_error_message(f"Error running '{name}': {str(e)}")
+            return False
+
+    def _batch_load(self):
+        self._wait_for_refresh()
+        self._replace_records(self.data_manager.read_data_from_db())
+        self.display.display_message(f"Loaded {len(self.records)} records from the database.")
+
+    def _batch_save(self):
+        self._check_not_stale()
+        self._check_valid(self.records)
+        self.data_manager.save_records_to_db(self.records)
+        self.display.display_message(f"Saved {len(self.records)} records to the database.")
+
+    def _batch_sort(self, *criteria):
+        # Each criterion is given as 'field' or 'field:order', e.g. 'total:desc'
+        sort_criteria = []
+        for criterion in criteria:
+            field, _, order = criterion.partition(':')
+            order = order or 'asc'
+            if order not in ('asc', 'desc'):
+                raise ValueError(f"Invalid sorting order '{order}'. Use 'asc' or 'desc'.")
+            sort_criteria.append((field, order))
+        self.display.display_records(self.data_manager.get_sorted_records(sort_criteria))
+
+    def _batch_import(self, file_path):
+        # The file is validated as text, so every bad value is reported before any conversion
+        frame = self.data_manager.read_csv_frame(file_path)
+        self._check_report(self.validator.validate_frame(frame))
+        records = self.data_manager.frame_to_records(frame)
+        self.data_manager.save_records_to_db(records)
+        self.display.display_message(f"Imported {len(records)} records from {file_path}.")
+
+    def _batch_export(self, file_path):
+        count = self.data_manager.write_records_to_csv(file_path, self.data_manager.iter_all_records())
+        self.display.display_message(f"Exported {count} records to {file_path}.")
+
+    def _batch_report(self):
+        records = list(self.data_manager.iter_all_records())
+        self.display.display_records(records)
+        # Documents without a total count as 0
+        total = sum(record.total or 0.0 for record in records)
+        self.display.display_message(f"{len(records)} records, total cost ${total:.2f}")
+
+    def _batch_summary(self, group='overall'):
+        summary = self.data_manager.get_cost_summary(group)
+        self.display.display_message(f"{group}: {summary['count']} records")
+        for field in DataManager.COST_FIELDS:
+            self.display.display_message(
+                f"  {field}: total ${summary[f'sum_{field}']:.2f}, average ${summary[f'avg_{field}']:.2f}")
+
+    def _batch_rebuild_rollups(self):
+        mismatches = self.data_manager.rebuild_rollups()
+        if mismatches:
+            self.display.display_error_message(
+                f"Rebuilt cost rollups; {len(mismatches)} groups were out of date: {', '.join(mismatches)}")
+        else:
+            self.display.display_message("Rebuilt cost rollups; all groups were up to date.")
+
+    def _batch_validate(self, file_path=None):
+        # Validates a CSV file when one is given, otherwise the whole database collection
+        if file_path:
+            report = self.validator.validate_frame(self.data_manager.read_csv_frame(file_path))
+        else:
+            report = self.validator.validate_frame(self.data_manager.read_data_frame())
+        self._check_report(report)
+        self.display.display_message(report.summary())
+
+    def _check_valid(self, records):
+        self._check_report(self.validator.validate(records))
+
+    def _check_report(self, report):
+        if not report.is_valid():
+            raise ValueError(report.summary())
+
+    def _batch_dedupe(self, *args):
+        # 'apply' writes the merge, 'field=rule' arguments override the conflict rules
+        dry_run = 'apply' not in args
+        rules = {}
+        for arg in args:
+            if arg == 'apply':
+                continue
+            field, separator, rule = arg.partition('=')
+            if not separator:
+                raise ValueError(f"Invalid argument '{arg}'. Use 'apply' or field=rule, e.g. total=max.")
+            rules[field] = rule
+        report = self.data_manager.deduplicate_records(rules, dry_run=dry_run)
+        self.display.display_message(report.summary())
@@ -1,11 +1,84 @@
 from controller.main_controller import MainController
+import argparse
+import shlex
+import sys
+
+
+def parse_batch_file(file_path):
+    """
+    Reads batch commands from a file, one command per line.
+
+    Blank lines and lines starting with '#' are skipped. Arguments are split
+    with shell quoting rules, so paths containing spaces can be quoted.
+
+    Parameters
+    ----------
+    file_path : str
+        The path of the batch command file.
+
+    Returns
+    -------
+    list of list of str
+        The commands, each as a name followed by its arguments.
+    """
+    commands = []
+    with open(file_path, encoding='utf-8') as batch_file:
+        for line in batch_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                commands.append(shlex.split(line))
+    return commands
+
+
+def build_parser():
+    """
+    Builds the command-line parser for the non-interactive mode.
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        The configured argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Travel Records Management System. Runs interactively when no command is given.")
+    parser.add_argument('command', nargs='?', choices=sorted(MainController.BATCH_COMMANDS),
+                        help="operation to run without prompts")
+    parser.add_argument('args', nargs='*',
+                        help="arguments of the operation, e.g. a CSV path or sort criteria like total:desc")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="file with one command per line to run after COMMAND")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of independent commands to run at the same time")
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs the application interactively, or headless when a command or batch file is given.
+
+    Returns
+    -------
+    int
+        The process exit status.
+    """
+    options = build_parser().parse_args(argv)
+    controller = MainController()
+    commands = []
+    if options.command:
+        commands.append([options.command] + options.args)
+    if options.batch:
+        commands.extend(parse_batch_file(options.batch))
+    if not commands:
+        controller.run()
+        return 0
+    return 1 if controller.run_batch(commands, jobs=max(options.jobs, 1)) else 0
+
 
 if __name__ == '__main__':
     """
     Main entry point of the Travel Records Management System application.
 
-    When the script is run as the main module, an instance of MainController is created
-    and its run method is called to start the application.
+    When the script is run as the main module, the command-line arguments are parsed
+    and either the interactive loop or the requested operations are run.
     """
-    controller = MainController()
-    controller.run()
+    sys.exit(main())
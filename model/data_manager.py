@@ -1,8 +1,14 @@
 from model.record import Record
+from model.rollups import CostRollups
+from model.deduplication import RecordDeduplicator
 import pymongo
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError
 from operator import attrgetter
 from datetime import datetime
+import csv
+import threading
+import pandas as pd
 
 
 class DataManager:
@@ -17,17 +23,28 @@ class DataManager:
     ----------
     MAX_RECORDS : int
         The maximum number of records to be read from the database.
+    RECORD_FIELDS : tuple of str
+        The fields of a travel record, in column order.
+    COST_FIELDS : tuple of str
+        The numeric cost fields of a travel record.
     client : MongoClient
         MongoDB client for database interaction.
     db : Database
         MongoDB database instance.
     collection : Collection
         MongoDB collection to store travel records.
+    rollups : CostRollups
+        Cost totals kept up to date by every insert, update and delete. They are built
+        from the whole collection before the first write or summary that needs them.
 
     Methods
     -------
     read_data_from_db():
         Reads travel records from MongoDB and returns them as a list of Record objects.
+    iter_all_records():
+        Yields every travel record in the MongoDB collection as a Record object.
+    read_data_frame():
+        Reads every travel record in the MongoDB collection into a DataFrame.
     insert_record(record):
         Inserts a new travel record into the MongoDB collection.
     update_record(ref_number, updated_details):
@@ -36,15 +53,35 @@ class DataManager:
         Deletes a travel record from the MongoDB collection based on its reference number.
     save_records_to_db(records):
         Saves multiple travel records to the MongoDB collection.
+    read_csv_frame(file_path):
+        Reads travel records from a CSV file into a DataFrame of text values.
+    frame_to_records(frame):
+        Converts a validated DataFrame of travel records into Record objects.
+    read_records_from_csv(file_path):
+        Reads travel records from a CSV file.
+    write_records_to_csv(file_path, records):
+        Writes travel records to a CSV file.
+    get_cost_summary(group='overall'):
+        Returns the cost count, sums and averages of a rollup group.
+    rebuild_rollups():
+        Recomputes the cost rollups from all records and reports the groups that were wrong.
+    deduplicate_records(rules=None, dry_run=True):
+        Merges documents sharing a reference number and reports likely duplicates.
     """
 
     MAX_RECORDS = 100
+    RECORD_FIELDS = ('ref_number', 'title_en', 'purpose_en', 'start_date', 'end_date',
+                     'airfare', 'other_transport', 'lodging', 'meals', 'other_expenses', 'total')
+    COST_FIELDS = ('airfare', 'other_transport', 'lodging', 'meals', 'other_expenses', 'total')
 
     def __init__(self):
         # Initialize MongoDB Client
         self.client = MongoClient('localhost', 27017)
         self.db = self.client['CST8333']
         self.collection = self.db['records']
+        self.rollups = CostRollups(self.db['record_rollups'])
+        self._rollups_built = False
+        self._rollups_lock = threading.Lock()
 
     def read_data_from_db(self):
         """
@@ -59,12 +96,43 @@ class DataManager:
             A list containing the travel records as Record objects.
         """
         mongo_records = self.collection.find().limit(self.MAX_RECORDS)
-        allowed_keys = {'ref_number', 'title_en', 'purpose_en', 'start_date', 'end_date',
-                        'airfare', 'other_transport', 'lodging', 'meals', 'other_expenses', 'total'}
+        allowed_keys = set(self.RECORD_FIELDS)
         records = [Record(**{k: v for k, v in record.items()
                             if k in allowed_keys}) for record in mongo_records]
         return records
 
+    def iter_all_records(self):
+        """
+        Yields every travel record in the MongoDB collection as a Record object.
+
+        Unlike read_data_from_db, the cursor is not limited to MAX_RECORDS, and records
+        are produced one at a time so the collection does not have to fit in memory.
+
+        Yields
+        ------
+        Record
+            The next travel record in the collection.
+        """
+        projection = dict.fromkeys(self.RECORD_FIELDS, 1)
+        projection['_id'] = 0
+        for document in self.collection.find({}, projection):
+            yield Record(**{field: document.get(field) for field in self.RECORD_FIELDS})
+
+    def read_data_frame(self):
+        """
+        Reads every travel record in the MongoDB collection into a DataFrame.
+
+        Only the record fields are fetched, and the cursor is not limited to MAX_RECORDS.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per document, with RECORD_FIELDS as columns.
+        """
+        projection = dict.fromkeys(self.RECORD_FIELDS, 1)
+        projection['_id'] = 0
+        return pd.DataFrame(list(self.collection.find({}, projection)), columns=list(self.RECORD_FIELDS))
+
     def insert_record(self, record):
         """
         Inserts a new travel record into the MongoDB collection.
@@ -74,7 +142,11 @@ class DataManager:
         record : Record
             The Record object to be inserted into the database.
         """
+        self._ensure_rollups()
+        # The deltas are computed before insert_one adds an _id to the document
+        totals = self.rollups.increments(None, record.__dict__)
         self.collection.insert_one(record.__dict__)
+        self.rollups.write(totals)
 
     def update_record(self, ref_number, updated_details):
         """
@@ -87,8 +159,26 @@ class DataManager:
         updated_details : dict
             A dictionary containing the updated details of the record.
         """
-        self.collection.update_one({'ref_number': ref_number}, {
-                                    '$set': updated_details}, upsert=True)
+        self._ensure_rollups()
+        self.rollups.apply(*self._upsert_record(ref_number, updated_details))
+
+    def _upsert_record(self, ref_number, updated_details):
+        # Returns the document before and after the write, for the rollup deltas
+        before = self.collection.find_one_and_update(
+            {'ref_number': ref_number}, {'$set': updated_details},
+            upsert=True, return_document=ReturnDocument.BEFORE)
+        return before, {**(before or {}), **updated_details}
+
+    def _ensure_rollups(self):
+        # Builds the rollups from the whole collection the first time they are needed,
+        # once even when several threads need them at the same time
+        if self._rollups_built:
+            return
+        with self._rollups_lock:
+            if not self._rollups_built:
+                if not self.rollups.is_built():
+                    self.rollups.rebuild(self.collection.find())
+                self._rollups_built = True
 
     def delete_record(self, ref_number):
         """
@@ -99,19 +189,176 @@ class DataManager:
         ref_number : str
             The reference number of the travel record to be deleted.
         """
-        self.collection.delete_one({'ref_number': ref_number})
+        self._ensure_rollups()
+        before = self.collection.find_one_and_delete({'ref_number': ref_number})
+        if before is not None:
+            self.rollups.apply(before, None)
 
     def save_records_to_db(self, records):
         """
         Saves multiple travel records to the MongoDB collection.
 
+        The rollup changes of all records are added up and written with one bulk write.
+
         Parameters
         ----------
         records : list of Record
             A list of Record objects to be saved to the database.
         """
+        self._ensure_rollups()
+        totals = {}
         for record in records:
-            self.update_record(record.ref_number, record.__dict__)
+            before, after = self._upsert_record(record.ref_number, record.__dict__)
+            self.rollups.increments(before, after, totals)
+        self.rollups.write(totals)
+
+    def read_csv_frame(self, file_path):
+        """
+        Reads travel records from a CSV file with a header row into a DataFrame.
+
+        Every value is kept as text, so the frame can be validated before any
+        conversion. Columns not listed in RECORD_FIELDS are ignored, missing columns
+        are filled with empty values and empty cost values become '0'.
+
+        Parameters
+        ----------
+        file_path : str
+            The path of the CSV file to read.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per record, with RECORD_FIELDS as columns.
+        """
+        frame = pd.read_csv(file_path, dtype=str, keep_default_na=False, encoding='utf-8')
+        frame = frame.reindex(columns=list(self.RECORD_FIELDS), fill_value='')
+        costs = list(self.COST_FIELDS)
+        frame[costs] = frame[costs].replace('', '0')
+        return frame
+
+    def frame_to_records(self, frame):
+        """
+        Converts a validated DataFrame of travel records into Record objects.
+
+        Parameters
+        ----------
+        frame : pandas.DataFrame
+            One row per record, with RECORD_FIELDS as columns and numeric costs.
+
+        Returns
+        -------
+        list of Record
+            A list containing the travel records as Record objects.
+        """
+        records = []
+        for row in frame[list(self.RECORD_FIELDS)].itertuples(index=False):
+            record_args = dict(zip(self.RECORD_FIELDS, row))
+            for field in self.COST_FIELDS:
+                record_args[field] = float(record_args[field])
+            records.append(Record(**record_args))
+        return records
+
+    def read_records_from_csv(self, file_path):
+        """
+        Reads travel records from a CSV file with a header row.
+
+        Columns not listed in RECORD_FIELDS are ignored, and cost columns are
+        converted to floats (empty values become 0.0). Use read_csv_frame and
+        validate the frame first when the file may contain invalid costs.
+
+        Parameters
+        ----------
+        file_path : str
+            The path of the CSV file to read.
+
+        Returns
+        -------
+        list of Record
+            A list containing the travel records as Record objects.
+        """
+        return self.frame_to_records(self.read_csv_frame(file_path))
+
+    def write_records_to_csv(self, file_path, records):
+        """
+        Writes travel records to a CSV file with a header row.
+
+        Parameters
+        ----------
+        file_path : str
+            The path of the CSV file to write.
+        records : iterable of Record
+            The Record objects to be written.
+
+        Returns
+        -------
+        int
+            The number of records written.
+        """
+        count = 0
+        with open(file_path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(self.RECORD_FIELDS)
+            for record in records:
+                writer.writerow([getattr(record, field) for field in self.RECORD_FIELDS])
+                count += 1
+        return count
+
+    def get_cost_summary(self, group='overall'):
+        """
+        Returns the cost count, sums and averages of a rollup group without scanning the records.
+
+        The rollups are built from the whole collection first if they never have been.
+
+        Parameters
+        ----------
+        group : str
+            'overall', 'title_en:<title>' or 'month:<YYYY-MM>'.
+
+        Returns
+        -------
+        dict
+            The record count, and 'sum_<field>' and 'avg_<field>' for every cost field.
+        """
+        self._ensure_rollups()
+        return self.rollups.summary(group)
+
+    def rebuild_rollups(self):
+        """
+        Recomputes the cost rollups from all records and reports the groups that were wrong.
+
+        Returns
+        -------
+        list of str
+            The identifiers of the groups whose stored totals did not match the records.
+        """
+        mismatches = self.rollups.rebuild(self.collection.find())
+        self._rollups_built = True
+        return mismatches
+
+    def deduplicate_records(self, rules=None, dry_run=True):
+        """
+        Merges documents sharing a reference number and reports likely duplicates.
+
+        Parameters
+        ----------
+        rules : dict, optional
+            Conflict rules keyed by field name, see RecordDeduplicator.
+        dry_run : bool
+            If True, only report what would change.
+
+        Returns
+        -------
+        DeduplicationReport
+            The duplicates found and the changes made or planned.
+        """
+        if not dry_run:
+            self._ensure_rollups()
+        try:
+            return RecordDeduplicator(self.collection, self.rollups).deduplicate(rules, dry_run)
+        except BulkWriteError:
+            # The rollups may have been marked as not built; check again before the next write
+            self._rollups_built = False
+            raise
 
     def get_sorted_records(self, sort_criteria):
         """
@@ -0,0 +1,371 @@
+from model.validation import RecordValidator
+from pymongo import DeleteMany, ReplaceOne
+from pymongo.errors import BulkWriteError
+import pandas as pd
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import zlib
+
+
+class DeduplicationReport:
+    """
+    A class used to describe the duplicates found in the records collection and how they are merged.
+
+    Attributes
+    ----------
+    exact : dict
+        Reference numbers whose documents are all identical, mapped to their document count.
+    conflicting : dict
+        Reference numbers whose documents differ, mapped to the names of the differing fields.
+    likely : list of list of str
+        Groups of different reference numbers sharing a normalized title, purpose and start date.
+    invalid : dict
+        Reference numbers left unmerged, mapped to the reasons their merge was rejected.
+    replaced : int
+        The number of documents replaced by a merged document.
+    deleted : int
+        The number of duplicate documents removed.
+    dry_run : bool
+        True if the changes were only planned and not applied.
+
+    Methods
+    -------
+    summary(limit=5):
+        Returns a compact, human readable description of the duplicates.
+    """
+
+    def __init__(self, dry_run):
+        self.exact = {}
+        self.conflicting = {}
+        self.likely = []
+        self.invalid = {}
+        self.replaced = 0
+        self.deleted = 0
+        self.dry_run = dry_run
+
+    def summary(self, limit=5):
+        """
+        Returns a compact, human readable description of the duplicates.
+
+        Parameters
+        ----------
+        limit : int
+            The number of examples listed for each kind of duplicate.
+
+        Returns
+        -------
+        str
+            A few lines describing the duplicates and the changes.
+        """
+        def examples(items):
+            items = list(items)
+            more = ', ...' if len(items) > limit else ''
+            return ', '.join(str(item) for item in items[:limit]) + more
+
+        if self.dry_run:
+            lines = [f"Would replace {self.replaced} and delete {self.deleted} documents."]
+        else:
+            lines = [f"Replaced {self.replaced} and deleted {self.deleted} documents."]
+        if self.exact:
+            lines.append(f"  exact duplicates: {len(self.exact)} ({examples(self.exact)})")
+        if self.conflicting:
+            lines.append(f"  conflicting duplicates: {len(self.conflicting)} ("
+                         + examples(f"{ref}: {'/'.join(fields)}" for ref, fields in self.conflicting.items()) + ")")
+        if self.likely:
+            lines.append(f"  likely duplicates with different ref_number: {len(self.likely)} ("
+                         + examples(' = '.join(refs) for refs in self.likely) + ")")
+        if self.invalid:
+            lines.append(f"  not merged, merge result invalid: {len(self.invalid)} ("
+                         + examples(f"{ref}: {'/'.join(reasons)}" for ref, reasons in self.invalid.items()) + ")")
+        return '\n'.join(lines)
+
+
+class RecordDeduplicator:
+    """
+    A class used to find and merge duplicate travel record documents.
+
+    The collection is read once. Each document is reduced to a small entry that is
+    spilled to one of several temporary files chosen by hashing its ref_number, and
+    to another chosen by hashing its normalized title, purpose and start date. The
+    number of partitions is sized from the estimated document count so that each
+    holds about PARTITION_SIZE entries. Every partition is then grouped, merged and
+    written on its own before the next one is read, so memory use is bounded by the
+    largest partition rather than by the collection. Full documents are only
+    fetched again for ref_numbers that occur more than once.
+
+    Documents sharing a ref_number are merged into the oldest one, field by field,
+    according to the conflict rules:
+
+    'first'      the value of the oldest document
+    'last'       the value of the newest document
+    'non_empty'  the newest value that is not None or empty
+    'min'        the smallest value that is not None
+    'max'        the largest value that is not None
+
+    Merged documents are checked with RecordValidator (for example, a 'max' total
+    may no longer equal the sum of its components). Groups whose merge fails the
+    checks, or whose values cannot be compared, are reported and left unchanged.
+
+    The changes of a partition are sent as one ordered bulk write, each merged
+    document before the deletion of its duplicates. If the bulk write fails, the
+    rollups are adjusted for the operations that were applied before the error,
+    and marked as not built if a deletion may have been partly applied.
+
+    Documents with different ref_numbers but the same normalized title, purpose
+    and start date are only reported. Documents without a ref_number are left alone.
+
+    Attributes
+    ----------
+    RECORD_FIELDS : tuple of str
+        The fields of a travel record.
+    PARTITION_SIZE : int
+        The number of entries aimed for in each temporary partition.
+    MAX_PARTITIONS : int
+        The largest number of partitions, which limits the number of open spill files.
+    DEFAULT_RULE : str
+        The conflict rule used for fields without an explicit rule.
+    RULES : tuple of str
+        The names of the available conflict rules.
+    collection : Collection
+        MongoDB collection storing travel records.
+    rollups : CostRollups or None
+        Cost rollups adjusted for the merged and deleted documents.
+    validator : RecordValidator
+        Checks the merged documents before they are written.
+
+    Methods
+    -------
+    deduplicate(rules=None, dry_run=True):
+        Finds duplicate records, merges them and reports the changes.
+    merge(documents, rules=None):
+        Merges documents sharing a ref_number into one document.
+    """
+
+    RECORD_FIELDS = ('ref_number', 'title_en', 'purpose_en', 'start_date', 'end_date',
+                     'airfare', 'other_transport', 'lodging', 'meals', 'other_expenses', 'total')
+    PARTITION_SIZE = 100000
+    MAX_PARTITIONS = 512
+    DEFAULT_RULE = 'non_empty'
+    RULES = ('first', 'last', 'non_empty', 'min', 'max')
+
+    def __init__(self, collection, rollups=None):
+        self.collection = collection
+        self.rollups = rollups
+        self.validator = RecordValidator()
+
+    @staticmethod
+    def _normalize(value):
+        if value is None:
+            return ''
+        if hasattr(value, 'strftime'):
+            return value.strftime('%Y-%m-%d')
+        return ' '.join(re.sub(r'[^\w\s]', ' ', str(value).lower()).split())
+
+    def _content_hash(self, document):
+        values = repr(tuple(document.get(field) for field in self.RECORD_FIELDS))
+        return hashlib.blake2b(values.encode('utf-8'), digest_size=16).digest()
+
+    def _likely_key(self, document):
+        start_date = self._normalize(document.get('start_date'))[:10]
+        return '\x1f'.join((self._normalize(document.get('title_en')),
+                            self._normalize(document.get('purpose_en')), start_date))
+
+    def _partition_count(self):
+        count = self.collection.estimated_document_count()
+        return min(self.MAX_PARTITIONS, max(1, -(-count // self.PARTITION_SIZE)))
+
+    @staticmethod
+    def _partition(key, partitions):
+        return zlib.crc32(key.encode('utf-8')) % partitions
+
+    @staticmethod
+    def _read_partition(file_path):
+        with open(file_path, 'rb') as partition_file:
+            while True:
+                try:
+                    yield pickle.load(partition_file)
+                except EOFError:
+                    return
+
+    def merge(self, documents, rules=None):
+        """
+        Merges documents sharing a ref_number into one document.
+
+        Parameters
+        ----------
+        documents : list of dict
+            The documents to merge, oldest first.
+        rules : dict, optional
+            Conflict rules keyed by field name; other fields use DEFAULT_RULE.
+
+        Returns
+        -------
+        dict
+            The merged document, keeping the _id and extra fields of the oldest document.
+
+        Raises
+        ------
+        ValueError
+            If a rule is unknown or 'min'/'max' meets values that cannot be compared.
+        """
+        rules = rules or {}
+        merged = dict(documents[0])
+        for field in self.RECORD_FIELDS:
+            rule = rules.get(field, self.DEFAULT_RULE)
+            values = [document.get(field) for document in documents]
+            present = [value for value in values if value is not None and value != '']
+            if rule == 'first':
+                merged[field] = values[0]
+            elif rule == 'last':
+                merged[field] = values[-1]
+            elif rule == 'non_empty':
+                merged[field] = present[-1] if present else values[-1]
+            elif rule in ('min', 'max'):
+                try:
+                    merged[field] = (min if rule == 'min' else max)(present) if present else values[-1]
+                except TypeError:
+                    raise ValueError(f"cannot compare {field} values") from None
+            else:
+                raise ValueError(f"Unknown conflict rule '{rule}' for {field}.")
+        return merged
+
+    def deduplicate(self, rules=None, dry_run=True):
+        """
+        Finds duplicate records, merges them and reports the changes.
+
+        Parameters
+        ----------
+        rules : dict, optional
+            Conflict rules keyed by field name; other fields use DEFAULT_RULE.
+        dry_run : bool
+            If True, only report what would change.
+
+        Returns
+        -------
+        DeduplicationReport
+            The duplicates found and the number of documents replaced and deleted.
+        """
+        rules = rules or {}
+        for field, rule in rules.items():
+            if field not in self.RECORD_FIELDS or rule not in self.RULES:
+                raise ValueError(f"Invalid conflict rule {field}={rule}.")
+
+        report = DeduplicationReport(dry_run)
+        partitions = self._partition_count()
+        with tempfile.TemporaryDirectory() as spill_dir:
+            ref_paths = [os.path.join(spill_dir, f'ref-{index}') for index in range(partitions)]
+            likely_paths = [os.path.join(spill_dir, f'likely-{index}') for index in range(partitions)]
+            ref_files = [open(path, 'wb') for path in ref_paths]
+            likely_files = [open(path, 'wb') for path in likely_paths]
+            try:
+                for document in self.collection.find():
+                    if document.get('ref_number') is None:
+                        continue
+                    ref_number = str(document['ref_number'])
+                    pickle.dump((document['_id'], ref_number, self._content_hash(document)),
+                                ref_files[self._partition(ref_number, partitions)])
+                    likely_key = self._likely_key(document)
+                    if likely_key.strip('\x1f'):
+                        pickle.dump((likely_key, ref_number),
+                                    likely_files[self._partition(likely_key, partitions)])
+            finally:
+                for spill_file in ref_files + likely_files:
+                    spill_file.close()
+
+            for path in ref_paths:
+                self._merge_partition(path, rules, report)
+            for path in likely_paths:
+                self._find_likely(path, report)
+        return report
+
+    def _merge_partition(self, file_path, rules, report):
+        groups = {}
+        for object_id, ref_number, content_hash in self._read_partition(file_path):
+            groups.setdefault(ref_number, []).append((object_id, content_hash))
+        duplicates = {ref: entries for ref, entries in groups.items() if len(entries) > 1}
+        if not duplicates:
+            return
+
+        ids = [object_id for entries in duplicates.values() for object_id, _ in entries]
+        documents = {document['_id']: document for document in self.collection.find({'_id': {'$in': ids}})}
+        merges = []
+        for ref_number, entries in duplicates.items():
+            group = sorted((documents[object_id] for object_id, _ in entries if object_id in documents),
+                           key=lambda document: str(document['_id']))
+            if len(group) < 2:
+                continue
+            if len({content_hash for _, content_hash in entries}) == 1:
+                report.exact[ref_number] = len(group)
+                merges.append((ref_number, group, group[0]))
+                continue
+            report.conflicting[ref_number] = [
+                field for field in self.RECORD_FIELDS
+                if len({repr(document.get(field)) for document in group}) > 1]
+            try:
+                merges.append((ref_number, group, self.merge(group, rules)))
+            except ValueError as e:
+                report.invalid[ref_number] = [str(e)]
+
+        invalid = self._check_merged([(ref_number, merged) for ref_number, _, merged in merges
+                                      if ref_number in report.conflicting])
+        report.invalid.update(invalid)
+
+        operations = []
+        changes = []
+        for ref_number, group, merged in merges:
+            if ref_number in invalid:
+                continue
+            # The merged document is written before its duplicates are deleted, so a
+            # failed replace leaves the whole group in place
+            if merged != group[0]:
+                operations.append(ReplaceOne({'_id': merged['_id']}, merged))
+                changes.append([(group[0], merged)])
+                report.replaced += 1
+            operations.append(DeleteMany({'_id': {'$in': [document['_id'] for document in group[1:]]}}))
+            changes.append([(document, None) for document in group[1:]])
+            report.deleted += len(group) - 1
+
+        # Each partition is written before the next one is read, keeping memory bounded
+        if operations and not report.dry_run:
+            try:
+                self.collection.bulk_write(operations, ordered=True)
+            except BulkWriteError as e:
+                # An ordered bulk write stops at the first error; only the operations before it were applied
+                failed = e.details['writeErrors'][0]['index']
+                self._write_rollups(changes[:failed])
+                if isinstance(operations[failed], DeleteMany) and self.rollups is not None:
+                    # Some of its documents may already be gone, so the totals can no longer be trusted
+                    self.rollups.invalidate()
+                raise
+            self._write_rollups(changes)
+
+    def _write_rollups(self, changes):
+        # Adds up the rollup changes of the applied operations and writes them with one bulk write
+        if self.rollups is None:
+            return
+        totals = {}
+        for pairs in changes:
+            for before, after in pairs:
+                self.rollups.increments(before, after, totals)
+        self.rollups.write(totals)
+
+    def _check_merged(self, merges):
+        # Returns the failed validation rules of each merged document, keyed by ref_number
+        if not merges:
+            return {}
+        frame = pd.DataFrame([merged for _, merged in merges], columns=list(self.RECORD_FIELDS))
+        validation = self.validator.validate_frame(frame)
+        invalid = {}
+        for rule, rows in validation.errors.items():
+            for row in rows:
+                invalid.setdefault(merges[row][0], []).append(rule)
+        return invalid
+
+    def _find_likely(self, file_path, report):
+        groups = {}
+        for likely_key, ref_number in self._read_partition(file_path):
+            groups.setdefault(likely_key, set()).add(ref_number)
+        report.likely.extend(sorted(refs) for refs in groups.values() if len(refs) > 1)
@@ -0,0 +1,254 @@
+from pymongo import DeleteMany, DeleteOne, ReplaceOne, UpdateOne
+
+
+class RollupsNotBuiltError(Exception):
+    """
+    Raised when cost rollups are read before they have been built from the records collection.
+    """
+
+
+class CostRollups:
+    """
+    A class used to maintain cost totals of travel records in a companion MongoDB collection.
+
+    Each rollup document holds a record count and the sum of every cost field for
+    one group: all records ('overall'), the records sharing a title ('title_en:<title>')
+    or the records starting in a month ('month:<YYYY-MM>'). The documents are
+    updated with $inc deltas computed from the record before and after each write,
+    so totals and averages can be read without scanning the records collection.
+
+    Sums are kept in integer cents, so repeated increments never drift. Costs that
+    are missing or cannot be read as a number count as 0. A marker
+    document records that the rollups were built from the full collection; until
+    it exists the totals are incomplete and cannot be read.
+
+    Attributes
+    ----------
+    COST_FIELDS : tuple of str
+        The cost fields that are summed.
+    MARKER_ID : str
+        The _id of the document marking the rollups as built.
+    collection : Collection
+        MongoDB collection holding the rollup documents.
+
+    Methods
+    -------
+    group_keys(document):
+        Returns the rollup groups a record document belongs to.
+    is_built():
+        Returns True if the rollups have been built from the records collection.
+    invalidate():
+        Marks the rollups as not built, so they are rebuilt before they are used again.
+    increments(before, after, totals=None):
+        Adds the change of one record document to a set of pending increments.
+    write(totals):
+        Writes pending increments with one bulk write.
+    apply(before, after):
+        Applies the change of one record document to the rollups.
+    summary(group='overall'):
+        Returns the count, sums and averages of one rollup group.
+    compute(documents):
+        Computes rollups from scratch.
+    rebuild(documents):
+        Recomputes the rollups, replaces the stored ones and reports the groups that differed.
+    """
+
+    COST_FIELDS = ('airfare', 'other_transport', 'lodging', 'meals', 'other_expenses', 'total')
+    MARKER_ID = '_built'
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def group_keys(document):
+        """
+        Returns the rollup groups a record document belongs to.
+
+        Parameters
+        ----------
+        document : dict
+            The fields of a travel record.
+
+        Returns
+        -------
+        list of str
+            The identifiers of the rollup groups.
+        """
+        keys = ['overall']
+        if document.get('title_en') is not None:
+            keys.append(f"title_en:{document['title_en']}")
+        start_date = document.get('start_date')
+        if hasattr(start_date, 'strftime'):
+            keys.append(f"month:{start_date.strftime('%Y-%m')}")
+        elif start_date:
+            keys.append(f"month:{str(start_date)[:7]}")
+        return keys
+
+    @staticmethod
+    def _cents(value):
+        # Costs that cannot be read as a finite number (e.g. 'N/A') count as 0, like missing ones
+        try:
+            return round(float(value if isinstance(value, (int, float)) else str(value)) * 100)
+        except (ValueError, OverflowError):
+            return 0
+
+    def _deltas(self, document, sign):
+        costs = {field: sign * self._cents(document.get(field)) for field in self.COST_FIELDS}
+        costs['count'] = sign
+        return {key: dict(costs) for key in self.group_keys(document)}
+
+    def is_built(self):
+        """
+        Returns True if the rollups have been built from the records collection.
+        """
+        return self.collection.find_one({'_id': self.MARKER_ID}) is not None
+
+    def invalidate(self):
+        """
+        Marks the rollups as not built, so they are rebuilt before they are used again.
+        """
+        self.collection.delete_one({'_id': self.MARKER_ID})
+
+    def increments(self, before, after, totals=None):
+        """
+        Adds the change of one record document to a set of pending increments.
+
+        Parameters
+        ----------
+        before : dict or None
+            The record as it was before the write, or None for an insert.
+        after : dict or None
+            The record as it is after the write, or None for a delete.
+        totals : dict, optional
+            Pending increments to add to; a new set is started if omitted.
+
+        Returns
+        -------
+        dict
+            The pending increments keyed by group identifier.
+        """
+        if totals is None:
+            totals = {}
+        for document, sign in ((before, -1), (after, 1)):
+            if document is None:
+                continue
+            for key, deltas in self._deltas(document, sign).items():
+                group = totals.setdefault(key, dict.fromkeys(deltas, 0))
+                for field, delta in deltas.items():
+                    group[field] += delta
+        return totals
+
+    def write(self, totals):
+        """
+        Writes pending increments with one bulk write.
+
+        Groups whose count drops to zero are removed in the same bulk write.
+
+        Parameters
+        ----------
+        totals : dict
+            The pending increments keyed by group identifier.
+        """
+        changed = {key: group for key, group in totals.items() if any(group.values())}
+        if not changed:
+            return
+        operations = [UpdateOne({'_id': key}, {'$inc': group}, upsert=True) for key, group in changed.items()]
+        if any(group['count'] < 0 for group in changed.values()):
+            operations.append(DeleteMany({'_id': {'$in': list(changed)}, 'count': {'$lte': 0}}))
+        self.collection.bulk_write(operations, ordered=True)
+
+    def apply(self, before, after):
+        """
+        Applies the change of one record document to the rollups.
+
+        Parameters
+        ----------
+        before : dict or None
+            The record as it was before the write, or None for an insert.
+        after : dict or None
+            The record as it is after the write, or None for a delete.
+        """
+        self.write(self.increments(before, after))
+
+    def summary(self, group='overall'):
+        """
+        Returns the count, sums and averages of one rollup group.
+
+        Parameters
+        ----------
+        group : str
+            The identifier of the group, e.g. 'overall', 'title_en:<title>' or 'month:2023-01'.
+
+        Returns
+        -------
+        dict
+            The record count, and 'sum_<field>' and 'avg_<field>' for every cost field.
+
+        Raises
+        ------
+        RollupsNotBuiltError
+            If the rollups have not been built yet.
+        """
+        if not self.is_built():
+            raise RollupsNotBuiltError("Cost rollups have not been built. Run 'rebuild-rollups' first.")
+        rollup = self.collection.find_one({'_id': group}) or {}
+        count = rollup.get('count', 0)
+        summary = {'group': group, 'count': count}
+        for field in self.COST_FIELDS:
+            total = rollup.get(field, 0) / 100
+            summary[f'sum_{field}'] = total
+            summary[f'avg_{field}'] = total / count if count else 0.0
+        return summary
+
+    def compute(self, documents):
+        """
+        Computes rollups from scratch.
+
+        Parameters
+        ----------
+        documents : iterable of dict
+            All record documents.
+
+        Returns
+        -------
+        dict
+            The rollup totals, in cents, keyed by group identifier.
+        """
+        rollups = {}
+        for document in documents:
+            self.increments(None, document, rollups)
+        return rollups
+
+    def rebuild(self, documents):
+        """
+        Recomputes the rollups, replaces the stored ones and reports the groups that differed.
+
+        The new groups are written with one ordered bulk write that removes the built
+        marker first and restores it last, so an interrupted rebuild leaves the rollups
+        marked as not built instead of losing them. Writes to the records collection
+        made while the rebuild runs may be lost, so it should be run when the
+        application is otherwise idle.
+
+        Parameters
+        ----------
+        documents : iterable of dict
+            All record documents.
+
+        Returns
+        -------
+        list of str
+            The identifiers of the groups whose stored totals did not match.
+        """
+        expected = self.compute(documents)
+        stored = {rollup.pop('_id'): rollup for rollup in self.collection.find({'_id': {'$ne': self.MARKER_ID}})}
+        fields = ('count',) + self.COST_FIELDS
+        mismatches = [key for key in sorted(set(expected) | set(stored))
+                      if any(expected.get(key, {}).get(field, 0) != stored.get(key, {}).get(field, 0)
+                             for field in fields)]
+
+        operations = [DeleteOne({'_id': self.MARKER_ID})]
+        operations.extend(ReplaceOne({'_id': key}, group, upsert=True) for key, group in expected.items())
+        operations.append(DeleteMany({'_id': {'$nin': list(expected) + [self.MARKER_ID]}}))
+        operations.append(ReplaceOne({'_id': self.MARKER_ID}, {'built': True}, upsert=True))
+        self.collection.bulk_write(operations, ordered=True)
+        return mismatches
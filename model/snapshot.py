@@ -0,0 +1,293 @@
+from model.record import Record
+from datetime import datetime, timedelta, timezone
+import math
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+
+class SnapshotError(Exception):
+    """
+    Raised when a snapshot file is missing, truncated, of an unknown version or corrupted.
+    """
+
+
+class RecordSnapshot:
+    """
+    A class used to store travel records in a local binary snapshot file.
+
+    The snapshot lets the application start with the last known records without
+    waiting for MongoDB. The file is memory-mapped, so opening it costs one
+    checksum pass and records are only built when they are accessed. Values keep
+    their types: datetime dates come back as datetime objects (naive, in UTC),
+    integer costs as integers and string costs as strings. Costs of any other
+    type (e.g. Decimal128) are kept as their text.
+
+    File layout (little-endian)::
+
+        header      magic (6s) | version (H) | record count (I) | blob size (Q) | crc32 (I) | padding
+        numbers     one float64 column per cost field, NaN for missing or text values
+        dates       one int64 column per date field, microseconds since the epoch,
+                    -2**63 when the value is not a datetime
+        strings     one (offset, length) uint32 pair column per text field, length 0xFFFFFFFF for None
+        cost texts  one (offset, length) uint32 pair column per cost field, for costs kept as text
+        kinds       one uint8 column per cost field: 0 float, 1 integer, 2 text
+        blob        UTF-8 string table referenced by the string and cost text columns
+
+    A date field that is a datetime is stored in its dates column; any other value
+    is stored in its string column. The crc32 covers everything after the header.
+
+    Attributes
+    ----------
+    MAGIC : bytes
+        The bytes identifying a snapshot file.
+    VERSION : int
+        The version of the file layout written by this class.
+    STRING_FIELDS : tuple of str
+        The text fields of a travel record, stored in the string table.
+    DATE_FIELDS : tuple of str
+        The text fields that may also hold datetime values.
+    NUMBER_FIELDS : tuple of str
+        The cost fields of a travel record, stored as float64 columns.
+
+    Methods
+    -------
+    write(file_path, records):
+        Writes travel records to a snapshot file.
+    open(file_path):
+        Memory-maps a snapshot file and returns its records.
+    """
+
+    MAGIC = b'TRSNAP'
+    VERSION = 3
+    STRING_FIELDS = ('ref_number', 'title_en', 'purpose_en', 'start_date', 'end_date')
+    DATE_FIELDS = ('start_date', 'end_date')
+    NUMBER_FIELDS = ('airfare', 'other_transport', 'lodging', 'meals', 'other_expenses', 'total')
+
+    FLOAT, INTEGER, TEXT = 0, 1, 2
+
+    _HEADER = struct.Struct('<6sHIQI')
+    _HEADER_SIZE = 32
+    _NONE_LENGTH = 0xFFFFFFFF
+    _NOT_A_DATETIME = -2 ** 63
+    _EPOCH = datetime(1970, 1, 1)
+
+    @classmethod
+    def write(cls, file_path, records):
+        """
+        Writes travel records to a snapshot file.
+
+        The file is written to a uniquely named temporary file next to it and then
+        moved into place, so a reader never sees a partially written snapshot and
+        concurrent writers do not interfere.
+
+        Parameters
+        ----------
+        file_path : str
+            The path of the snapshot file.
+        records : list of Record
+            The travel records to be stored.
+        """
+        records = list(records)
+        count = len(records)
+        blob = bytearray()
+
+        number_columns = []
+        cost_text_columns = []
+        kind_columns = []
+        for field in cls.NUMBER_FIELDS:
+            values = [getattr(record, field) for record in records]
+            kinds = [cls._cost_kind(value) for value in values]
+            number_columns.append(struct.pack(f'<{count}d', *(
+                float(value) if kind != cls.TEXT and value is not None else math.nan
+                for value, kind in zip(values, kinds))))
+            cost_text_columns.append(cls._pack_strings(
+                [value if kind == cls.TEXT else None for value, kind in zip(values, kinds)], blob))
+            kind_columns.append(bytes(kinds))
+
+        date_columns = []
+        for field in cls.DATE_FIELDS:
+            values = [getattr(record, field) for record in records]
+            date_columns.append(struct.pack(f'<{count}q', *(
+                cls._to_microseconds(value) if isinstance(value, datetime) else cls._NOT_A_DATETIME
+                for value in values)))
+
+        string_columns = []
+        for field in cls.STRING_FIELDS:
+            values = [getattr(record, field) for record in records]
+            string_columns.append(cls._pack_strings(
+                [None if isinstance(value, datetime) else value for value in values], blob))
+
+        body = (b''.join(number_columns) + b''.join(date_columns) + b''.join(string_columns)
+                + b''.join(cost_text_columns) + b''.join(kind_columns) + bytes(blob))
+        header = cls._HEADER.pack(cls.MAGIC, cls.VERSION, count, len(blob), zlib.crc32(body))
+        directory, name = os.path.split(os.path.abspath(file_path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix=name + '.', suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as snapshot_file:
+                snapshot_file.write(header.ljust(cls._HEADER_SIZE, b'\0'))
+                snapshot_file.write(body)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def open(cls, file_path):
+        """
+        Memory-maps a snapshot file and returns its records.
+
+        Parameters
+        ----------
+        file_path : str
+            The path of the snapshot file.
+
+        Returns
+        -------
+        SnapshotRecords
+            A read-only sequence of the stored travel records.
+
+        Raises
+        ------
+        SnapshotError
+            If the file is missing, truncated, of another version or fails its checksum.
+        """
+        try:
+            with open(file_path, 'rb') as snapshot_file:
+                buffer = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Cannot open snapshot {file_path}: {str(e)}") from e
+
+        try:
+            if len(buffer) < cls._HEADER_SIZE:
+                raise SnapshotError(f"Snapshot {file_path} is truncated.")
+            magic, version, count, blob_size, checksum = cls._HEADER.unpack_from(buffer)
+            if magic != cls.MAGIC:
+                raise SnapshotError(f"{file_path} is not a records snapshot.")
+            if version != cls.VERSION:
+                raise SnapshotError(f"Unsupported snapshot version {version} in {file_path}.")
+            wide_columns = len(cls.NUMBER_FIELDS) * 2 + len(cls.DATE_FIELDS) + len(cls.STRING_FIELDS)
+            body_size = count * 8 * wide_columns + count * len(cls.NUMBER_FIELDS) + blob_size
+            if len(buffer) != cls._HEADER_SIZE + body_size:
+                raise SnapshotError(f"Snapshot {file_path} is truncated.")
+            with memoryview(buffer) as view:
+                valid = zlib.crc32(view[cls._HEADER_SIZE:]) == checksum
+            if not valid:
+                raise SnapshotError(f"Snapshot {file_path} failed its checksum.")
+        except SnapshotError:
+            buffer.close()
+            raise
+        return SnapshotRecords(buffer, count, cls._HEADER_SIZE)
+
+    @classmethod
+    def _cost_kind(cls, value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return cls.FLOAT if value is None else cls.TEXT
+        return cls.INTEGER if isinstance(value, int) else cls.FLOAT
+
+    @classmethod
+    def _pack_strings(cls, values, blob):
+        # Appends the values to the blob and returns their (offset, length) pair column
+        pairs = []
+        for value in values:
+            if value is None:
+                pairs.extend((0, cls._NONE_LENGTH))
+                continue
+            encoded = str(value).encode('utf-8')
+            pairs.extend((len(blob), len(encoded)))
+            blob += encoded
+        return struct.pack(f'<{len(pairs)}I', *pairs)
+
+    @classmethod
+    def _to_microseconds(cls, value):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - cls._EPOCH) // timedelta(microseconds=1)
+
+    @classmethod
+    def _from_microseconds(cls, value):
+        return cls._EPOCH + timedelta(microseconds=value)
+
+
+class SnapshotRecords:
+    """
+    A read-only sequence of travel records backed by a memory-mapped snapshot.
+
+    Records are materialized into Record objects only when they are accessed.
+
+    Methods
+    -------
+    close():
+        Releases the memory map.
+    """
+
+    def __init__(self, buffer, count, offset):
+        self._buffer = buffer
+        self._count = count
+        self._view = view = memoryview(buffer)
+        column_size = count * 8
+
+        def take(size, fmt=None):
+            nonlocal offset
+            column = view[offset:offset + size]
+            offset += size
+            return column.cast(fmt) if fmt else column
+
+        self._numbers = [take(column_size, 'd') for _ in RecordSnapshot.NUMBER_FIELDS]
+        self._dates = {field: take(column_size, 'q') for field in RecordSnapshot.DATE_FIELDS}
+        self._strings = [take(column_size, 'I') for _ in RecordSnapshot.STRING_FIELDS]
+        self._cost_texts = [take(column_size, 'I') for _ in RecordSnapshot.NUMBER_FIELDS]
+        self._kinds = [take(count) for _ in RecordSnapshot.NUMBER_FIELDS]
+        self._blob = view[offset:]
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def _string(self, column, index):
+        start, length = column[2 * index], column[2 * index + 1]
+        if length == RecordSnapshot._NONE_LENGTH:
+            return None
+        return bytes(self._blob[start:start + length]).decode('utf-8')
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("snapshot record index out of range")
+        details = {}
+        for field, column in zip(RecordSnapshot.STRING_FIELDS, self._strings):
+            details[field] = self._string(column, index)
+            if details[field] is None and field in self._dates:
+                microseconds = self._dates[field][index]
+                if microseconds != RecordSnapshot._NOT_A_DATETIME:
+                    details[field] = RecordSnapshot._from_microseconds(microseconds)
+        for field, column, texts, kinds in zip(RecordSnapshot.NUMBER_FIELDS, self._numbers,
+                                               self._cost_texts, self._kinds):
+            kind = kinds[index]
+            if kind == RecordSnapshot.TEXT:
+                details[field] = self._string(texts, index)
+            elif math.isnan(column[index]):
+                details[field] = None
+            else:
+                details[field] = int(column[index]) if kind == RecordSnapshot.INTEGER else column[index]
+        return Record(**details)
+
+    def close(self):
+        """
+        Releases the memory map. The records can no longer be accessed afterwards.
+        """
+        columns = self._numbers + list(self._dates.values()) + self._strings + self._cost_texts + self._kinds
+        for column in columns:
+            column.release()
+        self._blob.release()
+        self._view.release()
+        self._buffer.close()
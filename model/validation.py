@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+
+class ValidationReport:
+    """
+    A class used to hold the outcome of validating a batch of travel records.
+
+    Attributes
+    ----------
+    record_count : int
+        The number of records that were checked.
+    errors : dict
+        The row positions failing each rule, keyed by rule name.
+    ref_numbers : dict
+        The reference numbers of the failing rows, keyed by rule name.
+
+    Methods
+    -------
+    is_valid():
+        Returns True if no rule failed.
+    summary(limit=5):
+        Returns a compact, human readable description of the failures.
+    """
+
+    def __init__(self, record_count, errors, ref_numbers):
+        self.record_count = record_count
+        self.errors = errors
+        self.ref_numbers = ref_numbers
+
+    def is_valid(self):
+        """
+        Returns True if no rule failed.
+        """
+        return not self.errors
+
+    def summary(self, limit=5):
+        """
+        Returns a compact, human readable description of the failures.
+
+        Parameters
+        ----------
+        limit : int
+            The number of reference numbers listed for each failing rule.
+
+        Returns
+        -------
+        str
+            One line per failing rule, or a single line if all records are valid.
+        """
+        if self.is_valid():
+            return f"All {self.record_count} records are valid."
+        lines = [f"{sum(len(rows) for rows in self.errors.values())} problems in {self.record_count} records:"]
+        for rule, rows in self.errors.items():
+            examples = ', '.join(str(ref) for ref in self.ref_numbers[rule][:limit])
+            more = ', ...' if len(rows) > limit else ''
+            lines.append(f"  {rule}: {len(rows)} ({examples}{more})")
+        return '\n'.join(lines)
+
+
+class RecordValidator:
+    """
+    A class used to validate whole batches of travel records at once.
+
+    Every rule is evaluated as a column operation over all records, so large
+    imports are checked without a Python loop per record.
+
+    Attributes
+    ----------
+    COST_FIELDS : tuple of str
+        The cost components that add up to the total.
+    DATE_FORMAT : str
+        The expected format of the start and end dates.
+    TOLERANCE : float
+        The largest accepted difference between the total and the sum of the components.
+
+    Methods
+    -------
+    validate(records):
+        Validates a list of Record objects.
+    validate_frame(frame):
+        Validates travel records held in a DataFrame.
+    """
+
+    COST_FIELDS = ('airfare', 'other_transport', 'lodging', 'meals', 'other_expenses')
+    DATE_FORMAT = '%Y-%m-%d'
+    TOLERANCE = 0.01
+
+    _COLUMNS = ('ref_number', 'start_date', 'end_date') + COST_FIELDS + ('total',)
+
+    def validate(self, records):
+        """
+        Validates a list of Record objects.
+
+        Parameters
+        ----------
+        records : iterable of Record
+            The travel records to be checked.
+
+        Returns
+        -------
+        ValidationReport
+            The failing rows for each rule.
+        """
+        frame = pd.DataFrame([vars(record) for record in records], columns=list(self._COLUMNS))
+        return self.validate_frame(frame)
+
+    def validate_frame(self, frame):
+        """
+        Validates travel records held in a DataFrame.
+
+        The rules are: a present and unique ref_number, numeric and non-negative
+        costs, dates in DATE_FORMAT with end_date not before start_date, and a total
+        equal to the sum of the cost components within TOLERANCE.
+
+        Parameters
+        ----------
+        frame : pandas.DataFrame
+            One row per record, with the record fields as columns.
+
+        Returns
+        -------
+        ValidationReport
+            The failing rows for each rule.
+        """
+        frame = frame.reindex(columns=list(self._COLUMNS))
+        ref_numbers = frame['ref_number']
+        costs = frame[list(self.COST_FIELDS) + ['total']].apply(pd.to_numeric, errors='coerce')
+        start_dates = pd.to_datetime(frame['start_date'], format=self.DATE_FORMAT, errors='coerce')
+        end_dates = pd.to_datetime(frame['end_date'], format=self.DATE_FORMAT, errors='coerce')
+        missing_ref = ref_numbers.isna() | (ref_numbers == '')
+
+        checks = {
+            'missing ref_number': missing_ref,
+            'duplicate ref_number': ref_numbers.duplicated(keep=False) & ~missing_ref,
+            'non-numeric cost': costs.isna().any(axis=1),
+            'negative cost': (costs < 0).any(axis=1),
+            'invalid start_date': start_dates.isna(),
+            'invalid end_date': end_dates.isna(),
+            # Dates are compared by day, so a same-day trip with a time of day is accepted
+            'end_date before start_date': end_dates.dt.normalize() < start_dates.dt.normalize(),
+            # Rows with a non-numeric cost compare as NaN here and are only reported above
+            'total does not match components': (
+                (costs['total'] - costs[list(self.COST_FIELDS)].sum(axis=1, skipna=False)).abs() > self.TOLERANCE),
+        }
+
+        errors = {}
+        failing_refs = {}
+        values = ref_numbers.to_numpy()
+        missing = missing_ref.to_numpy()
+        for rule, mask in checks.items():
+            rows = np.flatnonzero(mask.to_numpy())
+            if rows.size:
+                errors[rule] = rows
+                # Rows without a reference number are identified by their position instead
+                failing_refs[rule] = [f"row {row}" if missing[row] else values[row] for row in rows]
+        return ValidationReport(len(frame), errors, failing_refs)
@@ -0,0 +1,147 @@
+import copy
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+def make_document(ref_number='T-2023-P11-001', total=1000.00, **changes):
+    """
+    Builds a valid record document with a fresh ObjectId, whose airfare carries the
+    whole total, with the given fields replaced.
+    """
+    document = {'_id': ObjectId(), 'ref_number': ref_number, 'title_en': 'Test Title',
+                'purpose_en': 'Test Purpose', 'start_date': '2023-01-01', 'end_date': '2023-01-05',
+                'airfare': total, 'other_transport': 0.0, 'lodging': 0.0, 'meals': 0.0,
+                'other_expenses': 0.0, 'total': total}
+    document.update(changes)
+    return document
+
+
+class FakeCollection:
+    """
+    An in-memory stand-in for the parts of a pymongo Collection used by the model classes.
+
+    Filters support equality and the $in, $nin, $ne and $lte operators. Every call
+    that reaches the database is counted in `calls`, so tests can check round trips.
+    A bulk write operation whose filter equals `failing_filter` fails with a
+    BulkWriteError, stopping an ordered bulk write like the server does.
+    """
+
+    def __init__(self, documents=()):
+        self.documents = [copy.deepcopy(document) for document in documents]
+        self.calls = []
+        self.failing_filter = None
+        self._next_id = 0
+
+    @staticmethod
+    def _matches(document, query):
+        for field, condition in (query or {}).items():
+            value = document.get(field)
+            if isinstance(condition, dict):
+                for operator, operand in condition.items():
+                    if operator == '$in' and value not in operand:
+                        return False
+                    if operator == '$nin' and value in operand:
+                        return False
+                    if operator == '$ne' and value == operand:
+                        return False
+                    if operator == '$lte' and not (value is not None and value <= operand):
+                        return False
+            elif value != condition:
+                return False
+        return True
+
+    def _find(self, query):
+        return [document for document in self.documents if self._matches(document, query)]
+
+    def _insert(self, document):
+        if '_id' not in document:
+            self._next_id += 1
+            document['_id'] = self._next_id
+        self.documents.append(copy.deepcopy(document))
+
+    def find(self, query=None, projection=None):
+        self.calls.append('find')
+        results = [copy.deepcopy(document) for document in self._find(query)]
+        if projection:
+            included = {field for field, keep in projection.items() if keep}
+            for document in results:
+                for field in list(document):
+                    if field not in included and not (field == '_id' and projection.get('_id', 1)):
+                        del document[field]
+        return results
+
+    def find_one(self, query=None):
+        self.calls.append('find_one')
+        found = self._find(query)
+        return copy.deepcopy(found[0]) if found else None
+
+    def insert_one(self, document):
+        self.calls.append('insert_one')
+        self._insert(document)
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=False):
+        self.calls.append('find_one_and_update')
+        found = self._find(query)
+        if found:
+            before = copy.deepcopy(found[0])
+            found[0].update(copy.deepcopy(update['$set']))
+            return before
+        if upsert:
+            self._insert({**query, **update['$set']})
+        return None
+
+    def find_one_and_delete(self, query):
+        self.calls.append('find_one_and_delete')
+        found = self._find(query)
+        if not found:
+            return None
+        self.documents.remove(found[0])
+        return found[0]
+
+    def delete_one(self, query):
+        self.calls.append('delete_one')
+        found = self._find(query)
+        if found:
+            self.documents.remove(found[0])
+
+    def delete_many(self, query):
+        self.calls.append('delete_many')
+        self.documents = [document for document in self.documents if not self._matches(document, query)]
+
+    def estimated_document_count(self):
+        self.calls.append('estimated_document_count')
+        return len(self.documents)
+
+    def bulk_write(self, operations, ordered=True):
+        self.calls.append('bulk_write')
+        errors = []
+        for index, operation in enumerate(operations):
+            if self.failing_filter is not None and operation._filter == self.failing_filter:
+                errors.append({'index': index, 'code': 2, 'errmsg': 'simulated write error'})
+                if ordered:
+                    break
+                continue
+            self._apply(operation)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': [], 'upserted': []})
+
+    def _apply(self, operation):
+        query = operation._filter
+        found = self._find(query)
+        if isinstance(operation, UpdateOne):
+            if not found and operation._upsert:
+                self._insert(dict(query))
+                found = self._find(query)
+            for field, delta in (operation._doc['$inc'] if found else {}).items():
+                found[0][field] = found[0].get(field, 0) + delta
+        elif isinstance(operation, ReplaceOne):
+            if found:
+                self.documents.remove(found[0])
+            if found or operation._upsert:
+                self._insert({**copy.deepcopy(operation._doc), '_id': query['_id']})
+        elif isinstance(operation, DeleteOne):
+            if found:
+                self.documents.remove(found[0])
+        elif isinstance(operation, DeleteMany):
+            self.documents = [document for document in self.documents if document not in found]
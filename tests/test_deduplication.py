@@ -0,0 +1,165 @@
+import unittest
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from fake_collection import FakeCollection, make_document
+from model.deduplication import RecordDeduplicator
+from model.rollups import CostRollups
+
+
+class TestRecordDeduplicator(unittest.TestCase):
+    """
+    Unit test class for finding and merging duplicate records.
+
+    Methods
+    -------
+    test_merge_rules():
+        Test every conflict rule on one group.
+    test_merge_incomparable_values():
+        Test that min/max on mixed types raises ValueError.
+    test_dry_run_makes_no_writes():
+        Test exact and conflicting detection without writing.
+    test_apply_merges_and_updates_rollups():
+        Test that applying leaves one document per ref_number and exact rollups.
+    test_invalid_merge_not_written():
+        Test that a merge failing validation is reported and skipped.
+    test_failed_write_keeps_rollups_exact():
+        Test that a failed replace leaves its group in place and the rollups exact.
+    test_partition_count():
+        Test that the partition count follows the collection size.
+    """
+
+    def test_merge_rules(self):
+        """
+        Test that each conflict rule picks the expected value, oldest document first.
+        """
+        # Arrange
+        documents = [make_document('T-001', title_en='Old', purpose_en='Meeting', meals=10.0),
+                     make_document('T-001', title_en='Middle', purpose_en='', meals=30.0),
+                     make_document('T-001', title_en='New', purpose_en=None, meals=20.0)]
+        rules = {'title_en': 'first', 'meals': 'max', 'other_expenses': 'min', 'end_date': 'last'}
+
+        # Act
+        merged = RecordDeduplicator(FakeCollection()).merge(documents, rules)
+
+        # Assert
+        self.assertEqual(merged['_id'], documents[0]['_id'])
+        self.assertEqual(merged['title_en'], 'Old')
+        self.assertEqual(merged['purpose_en'], 'Meeting')
+        self.assertEqual(merged['meals'], 30.0)
+        self.assertEqual(merged['other_expenses'], 0.0)
+        self.assertEqual(merged['end_date'], '2023-01-05')
+        self.assertEqual(RecordDeduplicator(FakeCollection()).merge(documents, {'title_en': 'last'})['title_en'], 'New')
+
+    def test_merge_incomparable_values(self):
+        """
+        Test that 'min' on a mix of string and datetime dates raises ValueError.
+        """
+        documents = [make_document('T-001'), make_document('T-001', start_date=datetime(2023, 1, 1))]
+        with self.assertRaises(ValueError):
+            RecordDeduplicator(FakeCollection()).merge(documents, {'start_date': 'min'})
+
+    def test_dry_run_makes_no_writes(self):
+        """
+        Test that exact and conflicting duplicates are told apart and nothing is written.
+        """
+        # Arrange
+        exact = make_document('T-001')
+        conflicting = make_document('T-002', title_en='Old')
+        collection = FakeCollection([exact, dict(exact, _id=ObjectId()), conflicting,
+                                     make_document('T-002', title_en='New'), make_document('T-003')])
+        before = list(collection.documents)
+
+        # Act
+        report = RecordDeduplicator(collection).deduplicate()
+
+        # Assert
+        self.assertEqual(report.exact, {'T-001': 2})
+        self.assertEqual(report.conflicting, {'T-002': ['title_en']})
+        self.assertEqual((report.replaced, report.deleted), (1, 2))
+        self.assertEqual(report.likely, [['T-001', 'T-003']])
+        self.assertNotIn('bulk_write', collection.calls)
+        self.assertEqual(collection.documents, before)
+
+    def test_apply_merges_and_updates_rollups(self):
+        """
+        Test that applying keeps one merged document per ref_number and keeps the rollups exact.
+        """
+        # Arrange
+        documents = [make_document('T-001', 100.0), make_document('T-001', 100.0),
+                     make_document('T-002', 50.0), make_document('T-002', 80.0), make_document('T-003', 10.0)]
+        collection = FakeCollection(documents)
+        rollups = CostRollups(FakeCollection())
+        rollups.rebuild(documents)
+        rollups.collection.calls.clear()
+
+        # Act
+        report = RecordDeduplicator(collection, rollups).deduplicate(dry_run=False)
+
+        # Assert
+        self.assertEqual(report.deleted, 2)
+        self.assertEqual(sorted(document['ref_number'] for document in collection.documents), ['T-001', 'T-002', 'T-003'])
+        self.assertEqual(next(document['total'] for document in collection.documents
+                              if document['ref_number'] == 'T-002'), 80.0)
+        self.assertEqual(rollups.collection.calls.count('bulk_write'), 1)
+        self.assertEqual(rollups.rebuild(collection.documents), [])
+
+    def test_invalid_merge_not_written(self):
+        """
+        Test that a 'max' total no longer matching its components is reported and not written.
+        """
+        # Arrange
+        collection = FakeCollection([make_document('T-001', 100.0),
+                                     make_document('T-001', 300.0, airfare=200.0, meals=100.0)])
+
+        # Act
+        report = RecordDeduplicator(collection).deduplicate({'total': 'max', 'airfare': 'min', 'meals': 'min'},
+                                                            dry_run=False)
+
+        # Assert
+        self.assertEqual(report.invalid, {'T-001': ['total does not match components']})
+        self.assertEqual((report.replaced, report.deleted), (0, 0))
+        self.assertEqual(len(collection.documents), 2)
+
+    def test_failed_write_keeps_rollups_exact(self):
+        """
+        Test that when a merged document cannot be written, its duplicates are kept and only
+        the applied changes reach the rollups.
+        """
+        # Arrange
+        documents = [make_document('T-001', 100.0), make_document('T-001', 100.0, title_en='New'),
+                     make_document('T-002', 50.0), make_document('T-002', 50.0, title_en='New')]
+        collection = FakeCollection(documents)
+        collection.failing_filter = {'_id': documents[2]['_id']}
+        rollups = CostRollups(FakeCollection())
+        rollups.rebuild(documents)
+
+        # Act
+        with self.assertRaises(BulkWriteError):
+            RecordDeduplicator(collection, rollups).deduplicate(dry_run=False)
+
+        # Assert
+        self.assertEqual(sorted(document['ref_number'] for document in collection.documents),
+                         ['T-001', 'T-002', 'T-002'])
+        self.assertTrue(rollups.is_built())
+        self.assertEqual(rollups.rebuild(collection.documents), [])
+
+    def test_partition_count(self):
+        """
+        Test that the number of partitions grows with the collection and is capped.
+        """
+        # Arrange
+        deduplicator = RecordDeduplicator(FakeCollection([make_document(f'T-{index}') for index in range(25)]))
+        deduplicator.PARTITION_SIZE = 10
+
+        # Act / Assert
+        self.assertEqual(deduplicator._partition_count(), 3)
+        deduplicator.MAX_PARTITIONS = 2
+        self.assertEqual(deduplicator._partition_count(), 2)
+        deduplicator.MAX_PARTITIONS = 512
+        self.assertEqual(deduplicator.deduplicate().likely,
+                         [sorted(f'T-{index}' for index in range(25))])
+
+
+if __name__ == '__main__':
+    unittest.main()
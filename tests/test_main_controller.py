@@ -1,8 +1,12 @@
 import unittest
 import sys
+import os
+import tempfile
+import threading
 from unittest.mock import MagicMock
 from model.data_manager import DataManager
 from model.record import Record
+from model.snapshot import RecordSnapshot
 from controller.main_controller import MainController
 from unittest.mock import patch
 
@@ -24,6 +28,32 @@ class TestMainController(unittest.TestCase):
         Test deleting a record.
     test_save_data_to_db():
         Test saving data to the database.
+    test_run_batch():
+        Test running commands without prompts.
+    test_run_batch_unknown_command():
+        Test that unknown commands are reported as failures.
+    test_run_batch_refuses_serial_jobs():
+        Test that commands sharing records or rollups are not run concurrently.
+    test_run_batch_export():
+        Test that export writes every record, not only the first MAX_RECORDS.
+    test_run_batch_report_missing_total():
+        Test that records without costs count as 0 in the report.
+    test_warm_start_from_snapshot():
+        Test starting from the local snapshot and refreshing it from the database.
+    test_save_refused_while_snapshot_backed():
+        Test that snapshot records are not saved over the database.
+    test_load_waits_for_refresh():
+        Test that a slow background refresh cannot overwrite newer records.
+    test_load_despite_snapshot_error():
+        Test that a failed snapshot write does not fail the load.
+    test_run_batch_rebuild_rollups():
+        Test rebuilding the cost rollups from the command line.
+    test_save_invalid_data_to_db():
+        Test that records failing validation are not saved.
+    test_run_batch_dedupe():
+        Test passing conflict rules to the deduplication from the command line.
+    test_run_batch_dedupe_invalid_argument():
+        Test that malformed deduplication arguments are refused.
     """
 
     def setUp(self):
@@ -32,6 +62,9 @@ class TestMainController(unittest.TestCase):
         """
         sys.stderr.write("Tests run by: Gurarman Singh")
         self.controller = MainController()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.controller.SNAPSHOT_PATH = os.path.join(self.temp_dir.name, 'records.snapshot')
         self.controller.data_manager.insert_record = MagicMock()
         self.controller.data_manager.update_record = MagicMock()
         self.controller.data_manager.delete_record = MagicMock()
@@ -117,6 +150,232 @@ class TestMainController(unittest.TestCase):
         # Assert
         self.controller.data_manager.save_records_to_db.assert_called_once_with(self.controller.records)
 
+    @patch('builtins.input')
+    def test_run_batch(self, mock_input):
+        """
+        Test running load and save commands without prompting the user.
+        """
+        # Arrange
+        records = [Record('T-2023-P11-001', 'Test Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)]
+        self.controller.data_manager.read_data_from_db = MagicMock(return_value=records)
+
+        # Act
+        failures = self.controller.run_batch([['load'], ['save']])
+
+        # Assert
+        self.assertEqual(failures, 0)
+        self.controller.data_manager.save_records_to_db.assert_called_once_with(records)
+        mock_input.assert_not_called()
+
+    def test_run_batch_unknown_command(self):
+        """
+        Test that unknown commands are counted as failures.
+        """
+        # Act
+        failures = self.controller.run_batch([['bogus'], ['bogus']], jobs=2)
+
+        # Assert
+        self.assertEqual(failures, 2)
+
+    def test_run_batch_refuses_serial_jobs(self):
+        """
+        Test that load, save, import, rebuild-rollups and dedupe are refused when commands run concurrently.
+        """
+        # Arrange
+        self.controller.data_manager.read_data_from_db = MagicMock(return_value=[])
+        self.controller.data_manager.rebuild_rollups = MagicMock(return_value=[])
+        self.controller.data_manager.deduplicate_records = MagicMock()
+
+        # Act
+        failures = self.controller.run_batch([['load'], ['save']], jobs=2)
+        for command in (['import', 'records.csv'], ['rebuild-rollups'], ['dedupe']):
+            failures += self.controller.run_batch([['summary'], command], jobs=2)
+
+        # Assert
+        self.assertEqual(failures, 8)
+        self.controller.data_manager.read_data_from_db.assert_not_called()
+        self.controller.data_manager.save_records_to_db.assert_not_called()
+        self.controller.data_manager.rebuild_rollups.assert_not_called()
+        self.controller.data_manager.deduplicate_records.assert_not_called()
+
+    def test_run_batch_export(self):
+        """
+        Test that export streams every record of the collection to the CSV file.
+        """
+        # Arrange
+        records = [Record(f'T-2023-P11-{index:03}', 'Test Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)
+                   for index in range(DataManager.MAX_RECORDS + 1)]
+        self.controller.data_manager.iter_all_records = MagicMock(return_value=iter(records))
+        file_path = os.path.join(self.temp_dir.name, 'records.csv')
+
+        # Act
+        failures = self.controller.run_batch([['export', file_path]])
+
+        # Assert
+        self.assertEqual(failures, 0)
+        self.assertEqual(len(self.controller.data_manager.read_records_from_csv(file_path)), len(records))
+
+    def test_run_batch_report_missing_total(self):
+        """
+        Test that a document without a total or other costs does not break the report.
+        """
+        # Arrange
+        records = [Record('T-2023-P11-001', 'Test Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00),
+                   Record('T-2023-P11-002', None, None, None, None, None, None, None, None, None, None)]
+        self.controller.data_manager.iter_all_records = MagicMock(return_value=iter(records))
+        self.controller.display.display_message = MagicMock()
+
+        # Act
+        failures = self.controller.run_batch([['report']])
+
+        # Assert
+        self.assertEqual(failures, 0)
+        self.controller.display.display_message.assert_called_with("2 records, total cost $1000.00")
+
+    def test_warm_start_from_snapshot(self):
+        """
+        Test that records come from the snapshot first and are then refreshed from the database.
+        """
+        # Arrange
+        stale = [Record('T-2023-P11-001', 'Old Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)]
+        fresh = [Record('T-2023-P11-001', 'New Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)]
+        RecordSnapshot.write(self.controller.SNAPSHOT_PATH, stale)
+        self.controller.data_manager.read_data_from_db = MagicMock(return_value=fresh)
+
+        # Act
+        refresh = self.controller.warm_start()
+        refresh.join()
+
+        # Assert
+        self.assertIs(self.controller.records, fresh)
+        snapshot = RecordSnapshot.open(self.controller.SNAPSHOT_PATH)
+        self.assertEqual(snapshot[0].title_en, 'New Title')
+        snapshot.close()
+
+    def test_save_refused_while_snapshot_backed(self):
+        """
+        Test that saving waits for the refresh and refuses records that still come from the snapshot.
+        """
+        # Arrange
+        RecordSnapshot.write(self.controller.SNAPSHOT_PATH, [Record('T-2023-P11-001', 'Test Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)])
+        self.controller.data_manager.read_data_from_db = MagicMock(side_effect=ConnectionError("database unavailable"))
+
+        # Act
+        self.controller.warm_start()
+        self.controller.save_data_to_db()
+        failures = self.controller.run_batch([['save']])
+
+        # Assert
+        self.assertEqual(failures, 1)
+        self.controller.data_manager.save_records_to_db.assert_not_called()
+        self.controller.records.close()
+
+    def test_load_waits_for_refresh(self):
+        """
+        Test that an explicit load waits for the background refresh and keeps its own records.
+        """
+        # Arrange
+        stale = [Record('T-2023-P11-001', 'Old Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)]
+        fresh = [Record('T-2023-P11-001', 'New Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)]
+        RecordSnapshot.write(self.controller.SNAPSHOT_PATH, stale)
+        refresh_started = threading.Event()
+        release_refresh = threading.Event()
+
+        def read_data_from_db():
+            # The first call is the background refresh, which finishes only after the load has started
+            if not refresh_started.is_set():
+                refresh_started.set()
+                release_refresh.wait(5)
+                return stale
+            return fresh
+
+        self.controller.data_manager.read_data_from_db = MagicMock(side_effect=read_data_from_db)
+        threading.Timer(0.1, release_refresh.set).start()
+
+        # Act
+        self.controller.warm_start()
+        self.controller.load_data_from_db()
+
+        # Assert
+        self.assertIs(self.controller.records, fresh)
+
+    def test_load_despite_snapshot_error(self):
+        """
+        Test that records are loaded and only a warning is shown when the snapshot cannot be written.
+        """
+        # Arrange
+        records = [Record('T-2023-P11-001', 'Test Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)]
+        self.controller.data_manager.read_data_from_db = MagicMock(return_value=records)
+        self.controller.display.display_error_message = MagicMock()
+
+        # Act
+        with patch.object(RecordSnapshot, 'write', side_effect=TypeError("unsupported cost")):
+            failures = self.controller.run_batch([['load']])
+
+        # Assert
+        self.assertEqual(failures, 0)
+        self.assertIs(self.controller.records, records)
+        self.controller.display.display_error_message.assert_called_once_with(
+            "Warning: the local snapshot was not updated: unsupported cost")
+
+    def test_run_batch_rebuild_rollups(self):
+        """
+        Test that rebuilding the cost rollups succeeds even when groups were out of date.
+        """
+        # Arrange
+        self.controller.data_manager.rebuild_rollups = MagicMock(return_value=['overall'])
+
+        # Act
+        failures = self.controller.run_batch([['rebuild-rollups']])
+
+        # Assert
+        self.assertEqual(failures, 0)
+        self.controller.data_manager.rebuild_rollups.assert_called_once_with()
+
+    def test_save_invalid_data_to_db(self):
+        """
+        Test that records whose total does not match their costs are not saved.
+        """
+        # Arrange
+        self.controller.records = [Record('T-2023-P11-001', 'Test Title', 'Test Purpose', '2023-01-05', '2023-01-01', 500.00, 100.00, 200.00, 150.00, 50.00, 900.00)]
+
+        # Act
+        self.controller.save_data_to_db()
+        failures = self.controller.run_batch([['save']])
+
+        # Assert
+        self.assertEqual(failures, 1)
+        self.controller.data_manager.save_records_to_db.assert_not_called()
+
+    def test_run_batch_dedupe(self):
+        """
+        Test that 'dedupe' is a dry run unless 'apply' is given and forwards the conflict rules.
+        """
+        # Arrange
+        self.controller.data_manager.deduplicate_records = MagicMock()
+
+        # Act
+        failures = self.controller.run_batch([['dedupe'], ['dedupe', 'apply', 'total=max']])
+
+        # Assert
+        self.assertEqual(failures, 0)
+        self.controller.data_manager.deduplicate_records.assert_any_call({}, dry_run=True)
+        self.controller.data_manager.deduplicate_records.assert_any_call({'total': 'max'}, dry_run=False)
+
+    def test_run_batch_dedupe_invalid_argument(self):
+        """
+        Test that an argument that is neither 'apply' nor field=rule fails before deduplicating.
+        """
+        # Arrange
+        self.controller.data_manager.deduplicate_records = MagicMock()
+
+        # Act
+        failures = self.controller.run_batch([['dedupe', '--apply']])
+
+        # Assert
+        self.assertEqual(failures, 1)
+        self.controller.data_manager.deduplicate_records.assert_not_called()
+
 
 if __name__ == '__main__':
     print(f"Tests run by: Gurarman Singh")
@@ -0,0 +1,172 @@
+import unittest
+from bson import Decimal128
+from fake_collection import FakeCollection, make_document
+from model.data_manager import DataManager
+from model.record import Record
+from model.rollups import CostRollups, RollupsNotBuiltError
+
+
+class TestCostRollups(unittest.TestCase):
+    """
+    Unit test class for the incremental cost rollups.
+
+    Methods
+    -------
+    setUp():
+        Prepare built rollups over an empty collection.
+    test_insert_update_delete():
+        Test the delta math when a record is inserted, moved between groups and deleted.
+    test_summary_requires_build():
+        Test that unbuilt rollups cannot be read.
+    test_rebuild_detects_mismatches():
+        Test that rebuild reports and repairs out-of-date groups.
+    test_rebuild_large_totals():
+        Test that large float totals do not drift into false mismatches.
+    test_data_manager_builds_before_first_write():
+        Test that pre-existing records are counted before the first write.
+    test_unreadable_costs_count_as_zero():
+        Test that a stored cost that is not a number does not break the rollups.
+    test_save_writes_rollups_once():
+        Test that saving many records sends one rollup bulk write.
+    """
+
+    def setUp(self):
+        """
+        Set up built rollups over an empty collection before each test method.
+        """
+        self.rollups = CostRollups(FakeCollection())
+        self.rollups.rebuild([])
+
+    def test_insert_update_delete(self):
+        """
+        Test that inserting, moving and deleting a record keeps every group exact.
+        """
+        # Arrange
+        first = make_document('T-001', 100.10, title_en='Trip', start_date='2023-01-05')
+        moved = make_document('T-001', 250.25, title_en='Conference', start_date='2023-02-01')
+        other = make_document('T-002', 0.20, title_en='Trip', start_date='2023-01-20')
+
+        # Act / Assert
+        self.rollups.apply(None, first)
+        self.rollups.apply(None, other)
+        self.assertEqual(self.rollups.summary('title_en:Trip')['count'], 2)
+        self.assertAlmostEqual(self.rollups.summary('month:2023-01')['sum_total'], 100.30)
+
+        self.rollups.apply(first, moved)
+        self.assertEqual(self.rollups.summary('title_en:Trip')['count'], 1)
+        self.assertEqual(self.rollups.summary('title_en:Conference')['count'], 1)
+        self.assertAlmostEqual(self.rollups.summary()['sum_total'], 250.45)
+        self.assertAlmostEqual(self.rollups.summary()['avg_total'], 125.225)
+
+        self.rollups.apply(moved, None)
+        self.assertIsNone(self.rollups.collection.find_one({'_id': 'title_en:Conference'}))
+        self.assertIsNone(self.rollups.collection.find_one({'_id': 'month:2023-02'}))
+        self.assertEqual(self.rollups.summary()['count'], 1)
+        self.assertEqual(self.rollups.rebuild([other]), [])
+
+    def test_summary_requires_build(self):
+        """
+        Test that reading rollups that were never built raises an error.
+        """
+        # Arrange
+        rollups = CostRollups(FakeCollection())
+
+        # Act / Assert
+        self.assertFalse(rollups.is_built())
+        with self.assertRaises(RollupsNotBuiltError):
+            rollups.summary()
+
+    def test_rebuild_detects_mismatches(self):
+        """
+        Test that rebuild reports groups missing a record and repairs them.
+        """
+        # Arrange
+        documents = [make_document('T-001', 10.0, title_en='Trip', start_date='2023-01-05'),
+                     make_document('T-002', 20.0, title_en='Trip', start_date='2023-03-05')]
+        self.rollups.apply(None, documents[0])
+
+        # Act
+        mismatches = self.rollups.rebuild(documents)
+
+        # Assert
+        self.assertEqual(mismatches, ['month:2023-03', 'overall', 'title_en:Trip'])
+        self.assertEqual(self.rollups.rebuild(documents), [])
+        self.assertEqual(self.rollups.summary()['count'], 2)
+
+    def test_rebuild_large_totals(self):
+        """
+        Test that many increments on large totals still match a rebuild exactly.
+        """
+        # Arrange
+        documents = [make_document(f'T-{index:04}', 123456789.01 + index / 100) for index in range(200)]
+
+        # Act
+        for document in documents:
+            self.rollups.apply(None, document)
+
+        # Assert
+        self.assertEqual(self.rollups.rebuild(documents), [])
+
+    def test_data_manager_builds_before_first_write(self):
+        """
+        Test that deleting a pre-existing record leaves the other records in the overall group.
+        """
+        # Arrange
+        data_manager = DataManager()
+        data_manager.collection = FakeCollection([make_document('T-001', 10.0, title_en='Trip', start_date='2023-01-05'),
+                                                  make_document('T-002', 20.0, title_en='Trip', start_date='2023-01-06')])
+        data_manager.rollups = CostRollups(FakeCollection())
+
+        # Act
+        data_manager.delete_record('T-001')
+
+        # Assert
+        summary = data_manager.get_cost_summary()
+        self.assertEqual(summary['count'], 1)
+        self.assertAlmostEqual(summary['sum_total'], 20.0)
+
+    def test_unreadable_costs_count_as_zero(self):
+        """
+        Test that a stored 'N/A' cost counts as 0 when building, and later writes still succeed.
+        """
+        # Arrange
+        data_manager = DataManager()
+        data_manager.collection = FakeCollection([make_document('T-001', 10.0, airfare='N/A', meals=Decimal128('2.50'))])
+        data_manager.rollups = CostRollups(FakeCollection())
+
+        # Act
+        data_manager.insert_record(Record('T-002', 'Trip', 'Test Purpose', '2023-01-05', '2023-01-05',
+                                          5.0, 0.0, 0.0, 0.0, 0.0, 5.0))
+
+        # Assert
+        summary = data_manager.get_cost_summary()
+        self.assertEqual(summary['count'], 2)
+        self.assertAlmostEqual(summary['sum_airfare'], 5.0)
+        self.assertAlmostEqual(summary['sum_meals'], 2.5)
+        self.assertAlmostEqual(summary['sum_total'], 15.0)
+        self.assertEqual(data_manager.rebuild_rollups(), [])
+
+    def test_save_writes_rollups_once(self):
+        """
+        Test that saving several records updates the rollups with a single bulk write.
+        """
+        # Arrange
+        data_manager = DataManager()
+        data_manager.collection = FakeCollection([make_document('T-001', 10.0, title_en='Trip', start_date='2023-01-05')])
+        data_manager.rollups = self.rollups
+        self.rollups.rebuild(data_manager.collection.find())
+        self.rollups.collection.calls.clear()
+        records = [Record(f'T-00{index}', 'Trip', 'Test Purpose', '2023-01-05', '2023-01-05',
+                          5.0, 0.0, 0.0, 0.0, 0.0, 5.0) for index in range(1, 4)]
+
+        # Act
+        data_manager.save_records_to_db(records)
+
+        # Assert
+        self.assertEqual(self.rollups.collection.calls.count('bulk_write'), 1)
+        self.assertEqual(self.rollups.summary()['count'], 3)
+        self.assertAlmostEqual(self.rollups.summary()['sum_total'], 15.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
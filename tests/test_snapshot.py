@@ -0,0 +1,120 @@
+import unittest
+import os
+import tempfile
+import threading
+from datetime import datetime
+from bson import Decimal128
+from model.record import Record
+from model.snapshot import RecordSnapshot, SnapshotError
+
+
+class TestRecordSnapshot(unittest.TestCase):
+    """
+    Unit test class for writing and reading the local records snapshot.
+
+    Methods
+    -------
+    setUp():
+        Prepare a temporary snapshot path.
+    test_round_trip_keeps_types():
+        Test that datetimes, strings, integers and floats come back unchanged.
+    test_text_costs_round_trip():
+        Test that costs which are not numbers are kept as text.
+    test_concurrent_writes():
+        Test that writers running at the same time do not collide.
+    test_corrupted_snapshot():
+        Test that a damaged snapshot is rejected.
+    """
+
+    def setUp(self):
+        """
+        Set up a temporary snapshot path before each test method.
+        """
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, 'records.snapshot')
+
+    def test_round_trip_keeps_types(self):
+        """
+        Test that datetimes, strings, integers, floats and None values round-trip unchanged.
+        """
+        # Arrange
+        records = [
+            Record('T-2023-P11-001', 'Test Title', 'Test Purpose', datetime(2023, 1, 1, 9, 30, 15, 250000),
+                   datetime(2023, 1, 5), 500, 100.25, 200.00, 150.00, 50.00, 1000.25),
+            Record('T-2023-P11-002', 'Other Title', None, '2023-02-01', None,
+                   0, 0.0, None, 0, 0, 0),
+        ]
+
+        # Act
+        RecordSnapshot.write(self.path, records)
+        snapshot = RecordSnapshot.open(self.path)
+        loaded = [vars(record) for record in snapshot]
+        snapshot.close()
+
+        # Assert
+        self.assertEqual(loaded, [vars(record) for record in records])
+        self.assertIsInstance(loaded[0]['start_date'], datetime)
+        self.assertIsInstance(loaded[0]['airfare'], int)
+        self.assertIsInstance(loaded[0]['other_transport'], float)
+
+    def test_text_costs_round_trip(self):
+        """
+        Test that string costs come back as the same strings and Decimal128 costs as their text.
+        """
+        # Arrange
+        records = [Record('T-2023-P11-001', 'Test Title', 'Test Purpose', '2023-01-01', '2023-01-05',
+                          '12', 'N/A', Decimal128('200.10'), 150.00, 50, None)]
+
+        # Act
+        RecordSnapshot.write(self.path, records)
+        snapshot = RecordSnapshot.open(self.path)
+        loaded = vars(snapshot[0])
+        snapshot.close()
+
+        # Assert
+        self.assertEqual([loaded[field] for field in RecordSnapshot.NUMBER_FIELDS],
+                         ['12', 'N/A', '200.10', 150.00, 50, None])
+
+    def test_concurrent_writes(self):
+        """
+        Test that concurrent writers leave one complete snapshot and no temporary files.
+        """
+        # Arrange
+        batches = [[Record(f'T-{writer}-{index}', 'Test Title', 'Test Purpose', '2023-01-01', '2023-01-05',
+                           500.00, 100.00, 200.00, 150.00, 50.00, 1000.00) for index in range(200)]
+                   for writer in range(4)]
+        threads = [threading.Thread(target=RecordSnapshot.write, args=(self.path, batch)) for batch in batches]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        snapshot = RecordSnapshot.open(self.path)
+        ref_numbers = [record.ref_number for record in snapshot]
+        snapshot.close()
+
+        # Assert
+        self.assertIn(ref_numbers, [[record.ref_number for record in batch] for batch in batches])
+        self.assertEqual(os.listdir(self.temp_dir.name), ['records.snapshot'])
+
+    def test_corrupted_snapshot(self):
+        """
+        Test that a snapshot with a flipped byte fails its checksum.
+        """
+        # Arrange
+        RecordSnapshot.write(self.path, [Record('T-2023-P11-001', 'Test Title', 'Test Purpose', '2023-01-01', '2023-01-05', 500.00, 100.00, 200.00, 150.00, 50.00, 1000.00)])
+        with open(self.path, 'r+b') as snapshot_file:
+            snapshot_file.seek(-1, os.SEEK_END)
+            last = snapshot_file.read(1)
+            snapshot_file.seek(-1, os.SEEK_END)
+            snapshot_file.write(bytes([last[0] ^ 1]))
+
+        # Act / Assert
+        with self.assertRaises(SnapshotError):
+            RecordSnapshot.open(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime
+import pandas as pd
+from fake_collection import FakeCollection, make_document
+from model.data_manager import DataManager
+from model.validation import RecordValidator
+
+
+class TestRecordValidator(unittest.TestCase):
+    """
+    Unit test class for the batch record validation, breaking one rule per test.
+
+    Methods
+    -------
+    setUp():
+        Prepare a validator.
+    assertOnlyRule(rows, rule):
+        Assert that the rows break exactly one rule.
+    test_csv_file():
+        Test that every bad value of a CSV file is reported before conversion.
+    """
+
+    def setUp(self):
+        """
+        Set up a validator before each test method.
+        """
+        self.validator = RecordValidator()
+
+    def assertOnlyRule(self, rows, rule):
+        """
+        Assert that validating the rows fails the given rule and no other.
+        """
+        report = self.validator.validate_frame(pd.DataFrame(rows))
+        self.assertEqual(list(report.errors), [rule], report.summary())
+        return report
+
+    def test_valid_rows(self):
+        """
+        Test that valid rows pass every rule, including datetime dates ending on the day they start.
+        """
+        rows = [make_document(), make_document('T-2023-P11-002', start_date=datetime(2023, 1, 1, 8),
+                                              end_date=datetime(2023, 1, 2)),
+                make_document('T-2023-P11-003', start_date=datetime(2023, 1, 1, 17), end_date=datetime(2023, 1, 1))]
+        self.assertTrue(self.validator.validate_frame(pd.DataFrame(rows)).is_valid())
+
+    def test_negative_cost(self):
+        """
+        Test that a negative cost is reported when the total still reconciles.
+        """
+        self.assertOnlyRule([make_document(meals=-150.00, total=850.00, airfare=1000.00)], 'negative cost')
+
+    def test_non_numeric_cost(self):
+        """
+        Test that a cost that is not a number is reported.
+        """
+        self.assertOnlyRule([make_document(lodging='two hundred')], 'non-numeric cost')
+
+    def test_duplicate_ref_number(self):
+        """
+        Test that every row sharing a reference number is reported.
+        """
+        report = self.assertOnlyRule([make_document(), make_document(), make_document('T-2023-P11-002')], 'duplicate ref_number')
+        self.assertEqual(list(report.errors['duplicate ref_number']), [0, 1])
+
+    def test_missing_ref_number(self):
+        """
+        Test that missing reference numbers are reported by row position.
+        """
+        report = self.assertOnlyRule([make_document(), make_document(''), make_document(None)], 'missing ref_number')
+        self.assertEqual(report.ref_numbers['missing ref_number'], ['row 1', 'row 2'])
+
+    def test_total_within_tolerance(self):
+        """
+        Test that a total off by less than the tolerance is accepted.
+        """
+        self.assertTrue(self.validator.validate_frame(pd.DataFrame([make_document(total=1000.005, airfare=1000.00)])).is_valid())
+
+    def test_total_outside_tolerance(self):
+        """
+        Test that a total off by more than the tolerance is reported.
+        """
+        self.assertOnlyRule([make_document(total=1000.02, airfare=1000.00)], 'total does not match components')
+
+    def test_end_before_start(self):
+        """
+        Test that an end date before the start date is reported.
+        """
+        self.assertOnlyRule([make_document(end_date='2022-12-31')], 'end_date before start_date')
+
+    def test_invalid_date(self):
+        """
+        Test that a date in another format is reported.
+        """
+        self.assertOnlyRule([make_document(start_date='01/01/2023')], 'invalid start_date')
+
+    def test_csv_file(self):
+        """
+        Test that a CSV file with several bad values reports all of them, and converts once valid.
+        """
+        # Arrange
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        file_path = os.path.join(temp_dir.name, 'records.csv')
+        data_manager = DataManager()
+        rows = [make_document('T-001', lodging='two hundred'), make_document('T-002', airfare='', total=''),
+                make_document('T-003', meals='N/A'), make_document('T-004', start_date='01/01/2023')]
+        pd.DataFrame(rows).to_csv(file_path, index=False)
+
+        # Act
+        report = self.validator.validate_frame(data_manager.read_csv_frame(file_path))
+        pd.DataFrame(rows[1:2]).to_csv(file_path, index=False)
+        records = data_manager.frame_to_records(data_manager.read_csv_frame(file_path))
+
+        # Assert
+        self.assertEqual(report.ref_numbers, {'non-numeric cost': ['T-001', 'T-003'],
+                                              'invalid start_date': ['T-004']})
+        self.assertEqual((records[0].ref_number, records[0].airfare, records[0].total), ('T-002', 0.0, 0.0))
+
+    def test_whole_collection(self):
+        """
+        Test that the database frame covers more than MAX_RECORDS documents.
+        """
+        # Arrange
+        data_manager = DataManager()
+        rows = [make_document(f'T-{index:04}') for index in range(DataManager.MAX_RECORDS)]
+        data_manager.collection = FakeCollection(rows + [make_document('T-0000')])
+
+        # Act
+        report = self.validator.validate_frame(data_manager.read_data_frame())
+
+        # Assert
+        self.assertEqual(report.record_count, DataManager.MAX_RECORDS + 1)
+        self.assertEqual(report.ref_numbers['duplicate ref_number'], ['T-0000', 'T-0000'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,17 +36,17 @@ class Display:
         print(Fore.CYAN + "Travel Records Table")
         table = [
             [
-                record.ref_number[:15],  
-                record.title_en[:30],
-                record.purpose_en[:60],
+                (record.ref_number or "")[:15],
+                (record.title_en or "")[:30],
+                (record.purpose_en or "")[:60],
                 record.start_date,
                 record.end_date,
-                f"${record.airfare:.2f}",
-                f"${record.other_transport:.2f}",
-                f"${record.lodging:.2f}",
-                f"${record.meals:.2f}",
-                f"${record.other_expenses:.2f}",
-                f"${record.total:.2f}"
+                self._format_cost(record.airfare),
+                self._format_cost(record.other_transport),
+                self._format_cost(record.lodging),
+                self._format_cost(record.meals),
+                self._format_cost(record.other_expenses),
+                self._format_cost(record.total)
             ]
             for record in records
         ]
@@ -55,6 +55,11 @@ class Display:
 
         print(tabulate(table, headers=headers, tablefmt="grid"))
 
+    @staticmethod
+    def _format_cost(cost):
+        # Documents read straight from the database may be missing a cost
+        return "" if cost is None else f"${cost:.2f}"
+
     def display_single_record(self, record):
         """
         Displays a single travel record in a tabulated format.